@@ -0,0 +1,63 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+REPLICA_DB = 'replica'
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+
+@contextmanager
+def use_replica():
+    """Route reads made inside the block to the replica, if one is configured."""
+    token = _read_from_replica.set(True)
+    try:
+        yield
+    finally:
+        _read_from_replica.reset(token)
+
+
+def _pin_key(request):
+    """
+    Identify the client the same way DRF throttles do. Must be called with
+    an authenticated DRF request so writes and reads resolve the same user.
+    """
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        ident = f"user:{user.pk}"
+    else:
+        ident = f"ip:{BaseThrottle().get_ident(request)}"
+    return f"merchants:pinned:{ident}"
+
+
+def is_pinned(request):
+    """Whether the client wrote recently and must keep reading from the primary."""
+    return cache.get(_pin_key(request)) is not None
+
+
+def pin_to_primary(request):
+    """Keep the client on the primary for REPLICA_PIN_SECONDS after a write."""
+    cache.set(_pin_key(request), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+class PrimaryReplicaRouter:
+    """
+    Sends writes to the default database and reads made under use_replica()
+    to the replica database. Without a replica everything uses default.
+    """
+    
+    def db_for_read(self, model, **hints):
+        if _read_from_replica.get() and REPLICA_DB in settings.DATABASES:
+            return REPLICA_DB
+        return 'default'
+    
+    def db_for_write(self, model, **hints):
+        return 'default'
+    
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
@@ -69,6 +69,38 @@ DATABASES = {
     }
 }
 
+# Optional read replica, e.g. a second SQLite file or Postgres database locally.
+# Django does not copy data between the aliases; see the README for keeping a
+# local replica in sync with the primary.
+if os.getenv('REPLICA_DATABASE_NAME'):
+    DATABASES['replica'] = {
+        'ENGINE': os.getenv('REPLICA_DATABASE_ENGINE', DATABASES['default']['ENGINE']),
+        'NAME': os.getenv('REPLICA_DATABASE_NAME'),
+        'USER': os.getenv('REPLICA_DATABASE_USER', ''),
+        'PASSWORD': os.getenv('REPLICA_DATABASE_PASSWORD', ''),
+        'HOST': os.getenv('REPLICA_DATABASE_HOST', ''),
+        'PORT': os.getenv('REPLICA_DATABASE_PORT', ''),
+        'TEST': {
+            'MIRROR': 'default',
+        },
+    }
+
+DATABASE_ROUTERS = ['merchant_system.db_router.PrimaryReplicaRouter']
+
+# Cache shared by all worker processes. Throttling, request coalescing and
+# replica pinning keep their state here; without REDIS_URL each process uses
+# its own local-memory cache, which only suits a single-process dev server.
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+
+# Seconds a client keeps reading from the primary after a write
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', '5'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -106,8 +138,17 @@ REST_FRAMEWORK = {
         'rest_framework.renderers.JSONRenderer',
         'rest_framework.renderers.BrowsableAPIRenderer',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'merchant_report': os.getenv('MERCHANT_REPORT_THROTTLE_RATE', '10/min'),
+        'merchant_export': os.getenv('MERCHANT_EXPORT_THROTTLE_RATE', '10/min'),
+    },
 }
 
+# Request coalescing for expensive merchant actions (seconds)
+MERCHANT_COALESCE_RESULT_TTL = int(os.getenv('MERCHANT_COALESCE_RESULT_TTL', '1'))
+MERCHANT_COALESCE_WAIT_TIMEOUT = int(os.getenv('MERCHANT_COALESCE_WAIT_TIMEOUT', '60'))
+MERCHANT_COALESCE_POLL_INTERVAL = 0.1
+
 # CORS settings
 CORS_ALLOW_ALL_ORIGINS = DEBUG  # Allow all origins in development
 CORS_ALLOWED_ORIGINS = os.getenv(
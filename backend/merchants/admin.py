@@ -1,12 +1,21 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.utils import timezone
+from .coalescing import bump_generation
 from .models import Merchant
+from .pagination import EstimatedCountPaginator
 
 @admin.register(Merchant)
 class MerchantAdmin(admin.ModelAdmin):
     list_display = ['name', 'business_registration_number', 'email', 'phone', 'status', 'created_at']
-    list_filter = ['status', 'created_at']
+    list_filter = ['status']
     search_fields = ['name', 'email', 'business_registration_number']
     readonly_fields = ['created_at', 'updated_at']
+    date_hierarchy = 'created_at'
+    actions = ['mark_active', 'mark_pending', 'mark_suspended']
+    
+    # Avoid full COUNT(*) queries on large merchant tables
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
     
     fieldsets = (
         ('Basic Information', {
@@ -20,3 +29,30 @@ class MerchantAdmin(admin.ModelAdmin):
             'classes': ('collapse',)
         }),
     )
+    
+    def get_search_results(self, request, queryset, search_term):
+        """Use the same search as the merchants API."""
+        return queryset.search(search_term), False
+    
+    def _set_status(self, request, queryset, new_status):
+        """Update the status of all selected merchants in a single UPDATE."""
+        updated = queryset.update(status=new_status, updated_at=timezone.now())
+        # update() sends no post_save signals
+        bump_generation()
+        self.message_user(
+            request,
+            f"{updated} merchant(s) marked as {new_status}.",
+            messages.SUCCESS
+        )
+    
+    @admin.action(permissions=['change'], description='Mark selected merchants as Active')
+    def mark_active(self, request, queryset):
+        self._set_status(request, queryset, 'Active')
+    
+    @admin.action(permissions=['change'], description='Mark selected merchants as Pending')
+    def mark_pending(self, request, queryset):
+        self._set_status(request, queryset, 'Pending')
+    
+    @admin.action(permissions=['change'], description='Mark selected merchants as Suspended')
+    def mark_suspended(self, request, queryset):
+        self._set_status(request, queryset, 'Suspended')
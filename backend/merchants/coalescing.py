@@ -0,0 +1,85 @@
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+_MISSING = object()
+
+GENERATION_KEY = 'merchants:coalesce:gen'
+
+
+def get_generation():
+    """Current merchant write generation."""
+    return cache.get(GENERATION_KEY, 0)
+
+
+def bump_generation():
+    """
+    Invalidate coalesced results after merchants change, so later requests
+    never receive a result computed before the write.
+    """
+    cache.add(GENERATION_KEY, 0, timeout=None)
+    try:
+        cache.incr(GENERATION_KEY)
+    except ValueError:
+        # The key was evicted between add() and incr()
+        cache.set(GENERATION_KEY, 1, timeout=None)
+
+
+def make_key(action, **filters):
+    """
+    Build a coalescing key from an action name, its normalized filters and
+    the current write generation. Empty filters are dropped so that
+    equivalent requests share a key.
+    """
+    normalized = sorted(
+        (name, str(value))
+        for name, value in filters.items()
+        if value not in (None, '')
+    )
+    digest = hashlib.sha256(repr(normalized).encode()).hexdigest()
+    return f"merchants:coalesce:{action}:{get_generation()}:{digest}"
+
+
+def coalesce(key, compute):
+    """
+    Single-flight execution of compute() for concurrent callers sharing key.
+    
+    The first caller takes a lock in the cache and computes the result; callers
+    arriving meanwhile wait for that result instead of repeating the work. The
+    result is only kept for MERCHANT_COALESCE_RESULT_TTL seconds, long enough
+    for waiters to collect it. Requests handled by different worker processes
+    are only coalesced when REDIS_URL configures the shared Redis cache.
+    """
+    result_key = f"{key}:result"
+    lock_key = f"{key}:lock"
+    wait_timeout = settings.MERCHANT_COALESCE_WAIT_TIMEOUT
+    
+    result = cache.get(result_key, _MISSING)
+    if result is not _MISSING:
+        return result
+    
+    if cache.add(lock_key, True, timeout=wait_timeout):
+        try:
+            result = compute()
+            cache.set(result_key, result, timeout=settings.MERCHANT_COALESCE_RESULT_TTL)
+            return result
+        finally:
+            cache.delete(lock_key)
+    
+    deadline = time.monotonic() + wait_timeout
+    while time.monotonic() < deadline:
+        time.sleep(settings.MERCHANT_COALESCE_POLL_INTERVAL)
+        # Read the lock before the result so a leader finishing in between
+        # is not mistaken for a failed one
+        lock_held = cache.get(lock_key) is not None
+        result = cache.get(result_key, _MISSING)
+        if result is not _MISSING:
+            return result
+        if not lock_held:
+            # The leader finished without storing a result (e.g. it raised)
+            break
+    
+    return compute()
@@ -0,0 +1,74 @@
+# Generated by Django 4.2.7 on 2026-10-19 20:25
+
+from django.db import migrations, models
+
+
+CREATED_AT_INDEX = models.Index(fields=['created_at'], name='merchants_m_created_c2ecef_idx')
+
+TRIGRAM_INDEXES = [
+    ('merchants_m_name_trgm_idx', 'name'),
+    ('merchants_m_email_trgm_idx', 'email'),
+    ('merchants_m_busines_trgm_idx', 'business_registration_number'),
+]
+
+
+def create_created_at_index(apps, schema_editor):
+    """Build the created_at index without blocking writes on PostgreSQL."""
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.add_index(apps.get_model('merchants', 'Merchant'), CREATED_AT_INDEX)
+        return
+    schema_editor.execute(
+        f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {CREATED_AT_INDEX.name} '
+        f'ON merchants_merchant (created_at)'
+    )
+
+
+def drop_created_at_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.remove_index(apps.get_model('merchants', 'Merchant'), CREATED_AT_INDEX)
+        return
+    schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {CREATED_AT_INDEX.name}')
+
+
+def create_trigram_indexes(apps, schema_editor):
+    """Trigram GIN indexes let PostgreSQL serve the icontains search."""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON merchants_merchant '
+            f'USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, _ in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('merchants', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(
+                    model_name='merchant',
+                    index=CREATED_AT_INDEX,
+                ),
+            ],
+            database_operations=[
+                migrations.RunPython(create_created_at_index, drop_created_at_index),
+            ],
+        ),
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -1,5 +1,30 @@
 from django.db import models
+from django.db.models import Q
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.core.validators import RegexValidator, EmailValidator
+from .coalescing import bump_generation
+
+
+class MerchantQuerySet(models.QuerySet):
+    """
+    QuerySet with the merchant search shared by the API and the admin.
+    """
+    
+    def search(self, term):
+        """
+        Case-insensitive substring match on name, email and registration number.
+        On PostgreSQL these lookups are served by the trigram indexes added in
+        migration 0002.
+        """
+        term = term.strip()
+        if not term:
+            return self
+        return self.filter(
+            Q(name__icontains=term) |
+            Q(email__icontains=term) |
+            Q(business_registration_number__icontains=term)
+        )
 
 
 class Merchant(models.Model):
@@ -51,6 +76,8 @@ class Merchant(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    objects = MerchantQuerySet.as_manager()
+    
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Merchant'
@@ -59,7 +86,14 @@ class Merchant(models.Model):
             models.Index(fields=['email']),
             models.Index(fields=['business_registration_number']),
             models.Index(fields=['status']),
+            models.Index(fields=['created_at']),
         ]
     
     def __str__(self):
-        return f"{self.name} ({self.business_registration_number})"
\ No newline at end of file
+        return f"{self.name} ({self.business_registration_number})"
+
+
+@receiver([post_save, post_delete], sender=Merchant)
+def invalidate_coalesced_results(sender, **kwargs):
+    """Drop shared report/export results once merchants change."""
+    bump_generation()
@@ -0,0 +1,49 @@
+import json
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that uses the PostgreSQL planner's row estimate instead of
+    COUNT(*) for large tables. Falls back to an exact count on other
+    databases and whenever the estimate is small enough to count cheaply.
+    """
+    
+    exact_count_threshold = 10000
+    
+    @cached_property
+    def count(self):
+        estimate = self._estimate_count()
+        if estimate is None or estimate < self.exact_count_threshold:
+            return super().count
+        return estimate
+    
+    def _estimate_count(self):
+        """Return the planner's row estimate, or None if unavailable."""
+        queryset = self.object_list
+        if not hasattr(queryset, 'query'):
+            return None
+        
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return None
+        
+        with connection.cursor() as cursor:
+            if not queryset.query.where:
+                cursor.execute(
+                    'SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass',
+                    [queryset.model._meta.db_table]
+                )
+                row = cursor.fetchone()
+                # reltuples is -1 for tables that were never analyzed
+                return row[0] if row and row[0] >= 0 else None
+            
+            sql, params = queryset.order_by().query.get_compiler(queryset.db).as_sql()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return int(plan[0]['Plan']['Plan Rows'])
@@ -1,8 +1,21 @@
+import base64
+import threading
+import time
+from unittest import mock
+from django.conf import settings
+from django.contrib.auth.models import Permission, User
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework import status
-from rest_framework.test import APITestCase
+from rest_framework.test import APIClient, APITestCase
+from rest_framework.throttling import ScopedRateThrottle
+from merchant_system.db_router import PrimaryReplicaRouter, use_replica
+from .coalescing import coalesce, make_key
 from .models import Merchant
+from .pagination import EstimatedCountPaginator
 
 
 class MerchantModelTest(TestCase):
@@ -132,4 +145,350 @@ class MerchantAPITest(APITestCase):
         self.assertIn('total', response.data)
         self.assertIn('active', response.data)
         self.assertIn('pending', response.data)
-        self.assertIn('suspended', response.data)
\ No newline at end of file
+        self.assertIn('suspended', response.data)
+
+
+class MerchantAdminTest(TestCase):
+    """Test cases for the Merchant admin."""
+    
+    def setUp(self):
+        self.admin_user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(self.admin_user)
+        self.active = Merchant.objects.create(
+            name="Active Merchant",
+            business_registration_number="BRN000001",
+            email="active@example.com",
+            phone="+1000000001",
+            status="Active"
+        )
+        self.pending = Merchant.objects.create(
+            name="Pending Merchant",
+            business_registration_number="BRN000002",
+            email="pending@example.com",
+            phone="+1000000002",
+            status="Pending"
+        )
+    
+    def test_changelist_search_matches_api(self):
+        """Test admin search uses the same lookups as the API."""
+        url = reverse('admin:merchants_merchant_changelist')
+        response = self.client.get(url, {'q': 'brn000002'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            list(response.context['cl'].result_list),
+            list(Merchant.objects.search('brn000002'))
+        )
+        self.assertEqual(list(response.context['cl'].result_list), [self.pending])
+    
+    def test_changelist_date_hierarchy(self):
+        """Test changelist can be drilled down by creation date."""
+        url = reverse('admin:merchants_merchant_changelist')
+        created = self.active.created_at
+        response = self.client.get(url, {
+            'created_at__year': created.year,
+            'created_at__month': created.month,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.context['cl'].result_count, 2)
+    
+    def test_view_only_user_cannot_change_status(self):
+        """Test bulk status actions require the change permission."""
+        viewer = User.objects.create_user(
+            username='viewer',
+            password='password',
+            is_staff=True
+        )
+        viewer.user_permissions.add(Permission.objects.get(codename='view_merchant'))
+        self.client.force_login(viewer)
+        
+        url = reverse('admin:merchants_merchant_changelist')
+        response = self.client.post(url, {
+            'action': 'mark_suspended',
+            '_selected_action': [self.active.pk, self.pending.pk],
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Merchant.objects.filter(status='Suspended').count(), 0)
+    
+    def test_bulk_status_action_single_update(self):
+        """Test bulk status actions issue a single UPDATE."""
+        url = reverse('admin:merchants_merchant_changelist')
+        data = {
+            'action': 'mark_suspended',
+            '_selected_action': [self.active.pk, self.pending.pk],
+        }
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        updates = [q for q in queries.captured_queries if q['sql'].startswith('UPDATE "merchants_merchant"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Merchant.objects.filter(status='Suspended').count(), 2)
+
+
+class EstimatedCountPaginatorTest(TestCase):
+    """Test cases for the estimated-count admin paginator."""
+    
+    def setUp(self):
+        Merchant.objects.create(
+            name="Counted Merchant",
+            business_registration_number="BRN555555",
+            email="counted@example.com",
+            phone="+1555555555",
+            status="Active"
+        )
+    
+    def postgres_connection(self, row):
+        """Fake PostgreSQL connection whose cursor returns row."""
+        fake = mock.MagicMock(vendor='postgresql')
+        cursor = fake.cursor.return_value.__enter__.return_value
+        cursor.fetchone.return_value = row
+        return fake, cursor
+    
+    def test_exact_count_on_other_databases(self):
+        """Test SQLite falls back to COUNT(*)."""
+        paginator = EstimatedCountPaginator(Merchant.objects.all(), 10)
+        self.assertIsNone(paginator._estimate_count())
+        self.assertEqual(paginator.count, 1)
+    
+    def test_small_estimate_uses_exact_count(self):
+        """Test estimates below the threshold are replaced by COUNT(*)."""
+        paginator = EstimatedCountPaginator(Merchant.objects.all(), 10)
+        with mock.patch.object(paginator, '_estimate_count', return_value=50):
+            self.assertEqual(paginator.count, 1)
+    
+    def test_large_estimate_is_returned(self):
+        """Test estimates above the threshold skip COUNT(*)."""
+        paginator = EstimatedCountPaginator(Merchant.objects.all(), 10)
+        with mock.patch.object(paginator, '_estimate_count', return_value=250000):
+            with self.assertNumQueries(0):
+                self.assertEqual(paginator.count, 250000)
+    
+    def test_unfiltered_estimate_reads_reltuples(self):
+        """Test unfiltered querysets use pg_class.reltuples."""
+        fake, cursor = self.postgres_connection((120000,))
+        paginator = EstimatedCountPaginator(Merchant.objects.all(), 10)
+        with mock.patch('merchants.pagination.connections', {'default': fake}):
+            self.assertEqual(paginator._estimate_count(), 120000)
+        sql, params = cursor.execute.call_args[0]
+        self.assertIn('::regclass', sql)
+        self.assertEqual(params, ['merchants_merchant'])
+    
+    def test_unanalyzed_table_has_no_estimate(self):
+        """Test reltuples of -1 falls back to an exact count."""
+        fake, _ = self.postgres_connection((-1,))
+        paginator = EstimatedCountPaginator(Merchant.objects.all(), 10)
+        with mock.patch('merchants.pagination.connections', {'default': fake}):
+            self.assertIsNone(paginator._estimate_count())
+    
+    def test_filtered_estimate_uses_explain(self):
+        """Test filtered querysets use the EXPLAIN row estimate."""
+        fake, cursor = self.postgres_connection(([{'Plan': {'Plan Rows': 42000}}],))
+        queryset = Merchant.objects.filter(status='Active')
+        paginator = EstimatedCountPaginator(queryset, 10)
+        with mock.patch('merchants.pagination.connections', {'default': fake}):
+            self.assertEqual(paginator._estimate_count(), 42000)
+        sql, params = cursor.execute.call_args[0]
+        self.assertTrue(sql.startswith('EXPLAIN (FORMAT JSON) SELECT'))
+        self.assertNotIn('ORDER BY', sql)
+        self.assertEqual(list(params), ['Active'])
+
+
+class ExpensiveActionsTest(APITestCase):
+    """Test cases for throttling and coalescing of report and export actions."""
+    
+    def setUp(self):
+        cache.clear()
+        Merchant.objects.create(
+            name="Report Merchant",
+            business_registration_number="BRN222222",
+            email="report@example.com",
+            phone="+1222222222",
+            status="Active"
+        )
+    
+    def tearDown(self):
+        cache.clear()
+    
+    def test_export_csv_throttled(self):
+        """Test export requests beyond the scope rate are rejected."""
+        url = reverse('merchant-export-csv')
+        rates = {'merchant_export': '2/min', 'merchant_report': '2/min'}
+        with mock.patch.object(ScopedRateThrottle, 'THROTTLE_RATES', rates):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    def test_generate_report_throttled(self):
+        """Test report requests beyond the scope rate are rejected."""
+        url = reverse('merchant-generate-report')
+        rates = {'merchant_export': '1/min', 'merchant_report': '1/min'}
+        with mock.patch.object(ScopedRateThrottle, 'THROTTLE_RATES', rates):
+            self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_429_TOO_MANY_REQUESTS)
+    
+    def test_write_invalidates_shared_result(self):
+        """Test an export after a write includes the new merchant."""
+        url = reverse('merchant-export-csv')
+        self.client.get(url)
+        Merchant.objects.create(
+            name="Late Merchant",
+            business_registration_number="BRN444444",
+            email="late@example.com",
+            phone="+1444444444",
+            status="Pending"
+        )
+        response = self.client.get(url)
+        self.assertIn(b'Late Merchant', response.content)
+    
+    def test_bulk_admin_update_invalidates_shared_result(self):
+        """Test the admin bulk status action invalidates shared results."""
+        key = make_key('export_csv')
+        admin_user = User.objects.create_superuser(
+            username='admin',
+            email='admin@example.com',
+            password='password'
+        )
+        self.client.force_login(admin_user)
+        self.client.post(reverse('admin:merchants_merchant_changelist'), {
+            'action': 'mark_pending',
+            '_selected_action': list(Merchant.objects.values_list('pk', flat=True)),
+        })
+        self.assertNotEqual(make_key('export_csv'), key)
+    
+    def test_make_key_normalizes_filters(self):
+        """Test equivalent filters produce the same key."""
+        self.assertEqual(
+            make_key('export_csv', status='Active', search='shop'),
+            make_key('export_csv', search='shop', status='Active')
+        )
+        self.assertNotEqual(
+            make_key('export_csv', status='Active'),
+            make_key('export_csv', status='active')
+        )
+        self.assertEqual(
+            make_key('export_csv', status=None, search=''),
+            make_key('export_csv')
+        )
+        self.assertNotEqual(make_key('export_csv'), make_key('generate_report'))
+    
+    def test_make_key_changes_after_write(self):
+        """Test saving or deleting a merchant changes every key."""
+        key = make_key('generate_report', status='Active')
+        merchant = Merchant.objects.get()
+        merchant.save()
+        saved_key = make_key('generate_report', status='Active')
+        self.assertNotEqual(saved_key, key)
+        merchant.delete()
+        self.assertNotEqual(make_key('generate_report', status='Active'), saved_key)
+    
+    def test_concurrent_calls_compute_once(self):
+        """Test concurrent callers with the same key share one computation."""
+        calls = []
+        results = []
+        
+        def compute():
+            calls.append(1)
+            time.sleep(0.3)
+            return 'result'
+        
+        def worker():
+            results.append(coalesce('merchants:test', compute))
+        
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, ['result'] * 4)
+
+
+class ReplicaRoutingTest(APITestCase):
+    """Test cases for read-replica routing."""
+    
+    def setUp(self):
+        cache.clear()
+        self.router = PrimaryReplicaRouter()
+        self.merchant = Merchant.objects.create(
+            name="Routed Merchant",
+            business_registration_number="BRN333333",
+            email="routed@example.com",
+            phone="+1333333333",
+            status="Active"
+        )
+    
+    def test_router_without_replica(self):
+        """Test reads stay on default when no replica is configured."""
+        with use_replica():
+            self.assertEqual(self.router.db_for_read(Merchant), 'default')
+    
+    def test_router_with_replica(self):
+        """Test reads go to the replica only inside use_replica()."""
+        replica = {'ENGINE': 'django.db.backends.sqlite3', 'NAME': 'replica.sqlite3'}
+        with mock.patch.dict(settings.DATABASES, {'replica': replica}):
+            self.assertEqual(self.router.db_for_read(Merchant), 'default')
+            with use_replica():
+                self.assertEqual(self.router.db_for_read(Merchant), 'replica')
+                self.assertEqual(self.router.db_for_write(Merchant), 'default')
+    
+    def test_safe_requests_use_replica(self):
+        """Test list and export requests are served under use_replica()."""
+        with mock.patch('merchants.views.use_replica', wraps=use_replica) as replica:
+            self.client.get(reverse('merchant-list'))
+            self.client.get(reverse('merchant-export-csv'))
+        self.assertEqual(replica.call_count, 2)
+    
+    def test_write_pins_client_to_primary(self):
+        """Test later reads from a writing client skip the replica without cookies."""
+        url = reverse('merchant-detail', kwargs={'pk': self.merchant.pk})
+        self.client.patch(url, {'status': 'Suspended'}, format='json')
+        self.client.cookies.clear()
+        
+        with mock.patch('merchants.views.use_replica', wraps=use_replica) as replica:
+            response = APIClient().get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['status'], 'Suspended')
+        replica.assert_not_called()
+    
+    def test_write_pins_authenticated_client(self):
+        """Test a Basic-auth client stays on the primary after its write."""
+        User.objects.create_user(username='api', password='password')
+        credentials = base64.b64encode(b'api:password').decode()
+        auth = {'HTTP_AUTHORIZATION': f'Basic {credentials}'}
+        url = reverse('merchant-detail', kwargs={'pk': self.merchant.pk})
+        
+        response = APIClient().patch(url, {'status': 'Suspended'}, format='json', **auth)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        
+        with mock.patch('merchants.views.use_replica', wraps=use_replica) as replica:
+            response = APIClient().get(url, REMOTE_ADDR='10.0.0.3', **auth)
+        self.assertEqual(response.data['status'], 'Suspended')
+        replica.assert_not_called()
+        
+        with mock.patch('merchants.views.use_replica', wraps=use_replica) as replica:
+            APIClient().get(url)
+        replica.assert_called_once()
+    
+    def test_write_does_not_pin_other_clients(self):
+        """Test a write only pins the client that made it."""
+        url = reverse('merchant-detail', kwargs={'pk': self.merchant.pk})
+        self.client.patch(url, {'status': 'Suspended'}, format='json')
+        
+        with mock.patch('merchants.views.use_replica', wraps=use_replica) as replica:
+            APIClient().get(url, REMOTE_ADDR='10.0.0.2')
+        replica.assert_called_once()
+    
+    def test_pinned_client_skips_coalesced_result(self):
+        """Test a pinned client's export reflects its own write."""
+        url = reverse('merchant-export-csv')
+        self.client.get(url)
+        detail_url = reverse('merchant-detail', kwargs={'pk': self.merchant.pk})
+        self.client.patch(detail_url, {'name': 'Renamed Merchant'}, format='json')
+        response = APIClient().get(url)
+        self.assertIn(b'Renamed Merchant', response.content)
@@ -1,11 +1,16 @@
 from rest_framework import viewsets, status
+from rest_framework.permissions import SAFE_METHODS
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from django.db.models import Q
+from rest_framework.throttling import ScopedRateThrottle
 from django.http import HttpResponse
 import csv
+import io
+from contextlib import ExitStack
 import json
 from datetime import datetime
+from merchant_system.db_router import is_pinned, pin_to_primary, use_replica
+from .coalescing import coalesce, make_key
 from .models import Merchant
 from .serializers import MerchantSerializer
 
@@ -18,6 +23,29 @@ class MerchantViewSet(viewsets.ModelViewSet):
     
     queryset = Merchant.objects.all()
     serializer_class = MerchantSerializer
+    throttle_scope = None
+    
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._db_routing = ExitStack()
+    
+    def initial(self, request, *args, **kwargs):
+        """
+        Serve reads (including reports and exports) from the replica, except
+        for clients that wrote recently, who stay on the primary. Decided
+        after authentication so the pin is looked up for the same identity
+        it was stored under.
+        """
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS and not is_pinned(request):
+            self._db_routing.enter_context(use_replica())
+    
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Stop replica reads and pin clients to the primary after a write."""
+        self._db_routing.close()
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            pin_to_primary(request)
+        return super().finalize_response(request, response, *args, **kwargs)
     
     def get_queryset(self):
         """
@@ -33,14 +61,29 @@ class MerchantViewSet(viewsets.ModelViewSet):
         # Search functionality
         search = self.request.query_params.get('search', None)
         if search:
-            queryset = queryset.filter(
-                Q(name__icontains=search) |
-                Q(email__icontains=search) |
-                Q(business_registration_number__icontains=search)
-            )
+            queryset = queryset.search(search)
         
         return queryset
     
+    def get_coalescing_key(self):
+        """Key identifying the current action and its normalized filters."""
+        # Search is a stripped, case-insensitive match; status is exact
+        search = self.request.query_params.get('search', '').strip().lower()
+        return make_key(
+            self.action,
+            status=self.request.query_params.get('status'),
+            search=search
+        )
+    
+    def coalesce(self, compute):
+        """
+        Share compute() with concurrent identical requests. Clients pinned to
+        the primary compute their own result so they see their latest writes.
+        """
+        if is_pinned(self.request):
+            return compute()
+        return coalesce(self.get_coalescing_key(), compute)
+    
     def create(self, request, *args, **kwargs):
         """Create a new merchant with error handling."""
         try:
@@ -108,13 +151,25 @@ class MerchantViewSet(viewsets.ModelViewSet):
             'suspended': suspended
         })
     
-    @action(detail=False, methods=['get'])
+    @action(
+        detail=False,
+        methods=['get'],
+        throttle_classes=[ScopedRateThrottle],
+        throttle_scope='merchant_export'
+    )
     def export_csv(self, request):
         """Export merchants data as CSV."""
-        response = HttpResponse(content_type='text/csv')
+        content = self.coalesce(self._build_csv)
+        
+        response = HttpResponse(content, content_type='text/csv')
         response['Content-Disposition'] = f'attachment; filename="merchants_export_{datetime.now().strftime("%Y%m%d_%H%M%S")}.csv"'
         
-        writer = csv.writer(response)
+        return response
+    
+    def _build_csv(self):
+        """Render the filtered merchants as CSV text."""
+        output = io.StringIO()
+        writer = csv.writer(output)
         writer.writerow(['ID', 'Name', 'Email', 'Phone', 'Business Registration Number', 'Status', 'Created At', 'Updated At'])
         
         merchants = self.get_queryset()
@@ -130,11 +185,26 @@ class MerchantViewSet(viewsets.ModelViewSet):
                 merchant.updated_at.strftime('%Y-%m-%d %H:%M:%S')
             ])
         
-        return response
+        return output.getvalue()
     
-    @action(detail=False, methods=['get'])
+    @action(
+        detail=False,
+        methods=['get'],
+        throttle_classes=[ScopedRateThrottle],
+        throttle_scope='merchant_report'
+    )
     def generate_report(self, request):
         """Generate comprehensive merchant report."""
+        report_data = self.coalesce(self._build_report)
+        
+        response = HttpResponse(content_type='application/json')
+        response['Content-Disposition'] = f'attachment; filename="merchant_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json"'
+        response.write(report_data)
+        
+        return response
+    
+    def _build_report(self):
+        """Build the merchant report as JSON text."""
         merchants = self.get_queryset()
         total = merchants.count()
         active = merchants.filter(status='Active').count()
@@ -160,8 +230,4 @@ class MerchantViewSet(viewsets.ModelViewSet):
             'merchants': MerchantSerializer(merchants, many=True).data
         }
         
-        response = HttpResponse(content_type='application/json')
-        response['Content-Disposition'] = f'attachment; filename="merchant_report_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json"'
-        response.write(json.dumps(report_data, indent=2))
-        
-        return response
\ No newline at end of file
+        return json.dumps(report_data, indent=2)
\ No newline at end of file